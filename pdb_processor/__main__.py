@@ -51,6 +51,19 @@ def create_parser() -> argparse.ArgumentParser:
         type=int,
         help="限制处理数量（用于测试）",
     )
+    split_group = sabdab_parser.add_mutually_exclusive_group()
+    split_group.add_argument(
+        "--processes", "-p",
+        type=int,
+        default=0,
+        help="拆分进程数，0 表示在线程中拆分 (默认: 0)",
+    )
+    split_group.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="使用 aiohttp 异步下载（需要可选依赖 async）",
+    )
     
     # process 命令
     process_parser = subparsers.add_parser(
@@ -134,6 +147,8 @@ def main():
                 incremental,
                 args.threads,
                 args.limit,
+                args.processes,
+                args.use_async,
             )
         elif args.command == "process":
             cmd_process(
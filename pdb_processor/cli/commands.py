@@ -1,11 +1,13 @@
 """CLI command implementations"""
 
+import asyncio
 from typing import Optional
 
 from pdb_processor.core.config import Config
 from pdb_processor.core.downloader import PDBDownloader
 from pdb_processor.core.splitter import StructureSplitter
 from pdb_processor.sabdab.processor import SAbDabProcessor
+from pdb_processor.utils.chain_info_cache import get_chain_info_cached
 
 
 def cmd_sabdab(
@@ -14,6 +16,8 @@ def cmd_sabdab(
     incremental: bool,
     threads: int,
     limit: Optional[int],
+    processes: int = 0,
+    use_async: bool = False,
 ):
     """处理 SAbDab 数据库"""
     config = Config(base_dir=output_dir)
@@ -23,16 +27,32 @@ def cmd_sabdab(
     print(f"输出目录: {output_dir}")
     print(f"增量模式: {incremental}")
     print(f"线程数: {threads}")
+    if processes:
+        print(f"拆分进程数: {processes}")
+    if use_async:
+        print("异步下载: True")
     if limit:
         print(f"限制数量: {limit}")
     print("-" * 50)
     
-    stats = processor.process_sabdab(
-        tsv_path=tsv_file,
-        incremental=incremental,
-        max_threads=threads,
-        limit=limit,
-    )
+    try:
+        if use_async:
+            stats = asyncio.run(processor.process_sabdab_async(
+                tsv_path=tsv_file,
+                incremental=incremental,
+                max_threads=threads,
+                limit=limit,
+            ))
+        else:
+            stats = processor.process_sabdab(
+                tsv_path=tsv_file,
+                incremental=incremental,
+                max_threads=threads,
+                limit=limit,
+                processes=processes,
+            )
+    finally:
+        processor.close()
     
     print("\n" + "=" * 50)
     print("处理完成！统计信息：")
@@ -57,7 +77,6 @@ def cmd_process(
     config = Config(base_dir=output_dir)
     config.ensure_directories()
     
-    downloader = PDBDownloader(config)
     splitter = StructureSplitter(config)
     
     print(f"处理 PDB: {pdb_id}")
@@ -66,7 +85,8 @@ def cmd_process(
     print("-" * 50)
     
     # 下载
-    download_result = downloader.download(pdb_id, force=force)
+    with PDBDownloader(config) as downloader:
+        download_result = downloader.download(pdb_id, force=force)
     if not download_result.success:
         print(f"下载失败: {download_result.error}")
         return
@@ -100,17 +120,21 @@ def cmd_info(pdb_id: str, output_dir: str):
     config = Config(base_dir=output_dir)
     config.ensure_directories()
 
-    downloader = PDBDownloader(config)
     splitter = StructureSplitter(config)
 
     # 确保 PDB 已下载
-    download_result = downloader.download(pdb_id)
+    with PDBDownloader(config) as downloader:
+        download_result = downloader.download(pdb_id)
     if not download_result.success:
         print(f"下载失败: {download_result.error}")
         return
 
     # 获取链信息
-    chain_info = splitter.get_chain_info(download_result.path)
+    chain_info = get_chain_info_cached(
+        splitter,
+        download_result.path,
+        config.get_chain_info_cache_path(download_result.pdb_id),
+    )
 
     print(f"\nPDB {pdb_id.upper()} 链信息:")
     print("-" * 40)
@@ -1,13 +1,15 @@
 """Retry failed entries command"""
 
-import json
 from typing import Optional
 
 from tqdm import tqdm
 
-from pdb_processor.core.config import Config
+from pdb_processor.core.config import PROGRESS_OPTIONS, Config
 from pdb_processor.core.downloader import PDBDownloader
+from pdb_processor.core.pipeline import Pipeline, SplitJob
 from pdb_processor.core.splitter import StructureSplitter
+from pdb_processor.utils.json_utils import loads, read_ndjson, write_ndjson
+from pdb_processor.utils.pdb_utils import normalize_pdb_id
 
 
 def cmd_retry(output_dir: str, limit: Optional[int]):
@@ -15,31 +17,34 @@ def cmd_retry(output_dir: str, limit: Optional[int]):
     config = Config(base_dir=output_dir)
     config.ensure_directories()
 
-    failed_file = config.sabdab_dir / "failed_entries.json"
-    if not failed_file.exists():
+    failed_file = config.get_failed_entries_path()
+    legacy_file = failed_file.with_suffix(".json")
+    if failed_file.exists():
+        failed_entries = read_ndjson(failed_file)
+    elif legacy_file.exists():
+        # 兼容旧版本生成的 JSON 数组格式
+        failed_entries = loads(legacy_file.read_bytes())
+    else:
         print(f"未找到失败记录文件: {failed_file}")
         return
 
-    with open(failed_file, "r") as f:
-        failed_entries = json.load(f)
-
     if not failed_entries:
         print("没有失败的条目需要重试")
         return
 
     print(f"找到 {len(failed_entries)} 个失败条目")
 
-    downloader = PDBDownloader(config)
     splitter = StructureSplitter(config)
 
-    stats = _retry_entries(downloader, splitter, failed_entries, limit)
+    with PDBDownloader(config) as downloader:
+        stats = _retry_entries(downloader, splitter, failed_entries, limit)
 
     # 更新失败记录
     remaining = failed_entries[limit:] if limit else []
     all_still_failed = stats["still_failed"] + remaining
 
-    with open(failed_file, "w") as f:
-        json.dump(all_still_failed, f, indent=2)
+    write_ndjson(failed_file, all_still_failed)
+    legacy_file.unlink(missing_ok=True)
 
     print("\n" + "=" * 50)
     print("重试完成！")
@@ -51,64 +56,68 @@ def cmd_retry(output_dir: str, limit: Optional[int]):
 
 def _retry_entries(downloader, splitter, failed_entries, limit):
     """执行重试逻辑"""
-    retry_success = 0
-    retry_failed = 0
-    still_failed = []
-
     entries_to_retry = failed_entries[:limit] if limit else failed_entries
+    outcomes = [None] * len(entries_to_retry)
+
+    # 同一 PDB 的多个条目只下载一次，下载与拆分经流水线重叠执行
+    groups = {}
+    for i, entry in enumerate(entries_to_retry):
+        chains = _parse_entry_key(entry["entry_key"])
+        if chains is None:
+            outcomes[i] = {"success": False, "error_entry": entry}
+            continue
+        antibody_chains, antigen_chains = chains
+        groups.setdefault(normalize_pdb_id(entry["pdb_id"]), []).append(SplitJob(
+            antigen_chains=antigen_chains,
+            antibody_chains=antibody_chains,
+            suffix=antibody_chains.replace(",", ""),
+            tag=i,
+        ))
+
+    print(f"下载 {len(groups)} 个 PDB ...")
+    total_jobs = sum(len(jobs) for jobs in groups.values())
+    max_threads = downloader.config.MAX_THREADS
+    with Pipeline(downloader, splitter, download_workers=max_threads) as pipeline:
+        progress = tqdm(
+            pipeline.run(groups.items()), total=total_jobs, desc="Retrying", **PROGRESS_OPTIONS
+        )
+        for item in progress:
+            outcomes[item.job.tag] = _to_outcome(entries_to_retry[item.job.tag], item)
+
+    # 按原顺序汇总，保持失败记录顺序稳定
+    still_failed = [o["error_entry"] for o in outcomes if not o["success"]]
+    retry_success = len(outcomes) - len(still_failed)
+
+    return {"success": retry_success, "failed": len(still_failed), "still_failed": still_failed}
+
+
+def _parse_entry_key(entry_key):
+    """解析 entry_key: PDB_antibody_antigen，返回 (抗体链, 抗原链)，格式错误返回 None"""
+    parts = entry_key.split("_")
+    if len(parts) < 3:
+        return None
 
-    for entry in tqdm(entries_to_retry, desc="Retrying"):
-        result = _process_entry(downloader, splitter, entry)
-        if result["success"]:
-            retry_success += 1
-        else:
-            still_failed.append(result["error_entry"])
-            retry_failed += 1
-
-    return {"success": retry_success, "failed": retry_failed, "still_failed": still_failed}
+    # 转换为大写并去重（整串转大写一次，保持原有顺序）
+    antibody_chains = ",".join(dict.fromkeys(parts[1].upper().split(",")))
+    antigen_chains = ",".join(dict.fromkeys(parts[2].upper().split(",")))
+    return antibody_chains, antigen_chains
 
 
-def _process_entry(downloader, splitter, entry):
-    """处理单个失败条目"""
+def _to_outcome(entry, item):
+    """将单个失败条目的流水线结果转换为重试结果"""
     pdb_id = entry["pdb_id"]
     entry_key = entry["entry_key"]
 
-    # 解析 entry_key: PDB_antibody_antigen
-    parts = entry_key.split("_")
-    if len(parts) < 3:
-        return {"success": False, "error_entry": entry}
-
-    antibody_chains = parts[1]
-    antigen_chains = parts[2]
-
-    # 转换为大写并去重
-    ab_unique = list(dict.fromkeys(c.upper() for c in antibody_chains.split(",")))
-    ag_unique = list(dict.fromkeys(c.upper() for c in antigen_chains.split(",")))
-    antibody_chains = ",".join(ab_unique)
-    antigen_chains = ",".join(ag_unique)
-
-    # 下载
-    download_result = downloader.download(pdb_id)
-    if not download_result.success:
+    if not item.download.success:
         return {
             "success": False,
-            "error_entry": {"entry_key": entry_key, "pdb_id": pdb_id, "error": download_result.error},
+            "error_entry": {"entry_key": entry_key, "pdb_id": pdb_id, "error": item.download.error},
         }
 
-    # 拆分
-    split_result = splitter.split_structure(
-        pdb_file=download_result.path,
-        antigen_chains=antigen_chains,
-        antibody_chains=antibody_chains,
-        pdb_id=pdb_id,
-        suffix=antibody_chains.replace(",", ""),
-    )
-
-    if split_result.success:
+    if item.split.success:
         return {"success": True, "error_entry": None}
     else:
         return {
             "success": False,
-            "error_entry": {"entry_key": entry_key, "pdb_id": pdb_id, "error": split_result.error},
+            "error_entry": {"entry_key": entry_key, "pdb_id": pdb_id, "error": item.split.error},
         }
-
@@ -2,7 +2,8 @@
 
 from pdb_processor.core.config import Config
 from pdb_processor.core.downloader import PDBDownloader
+from pdb_processor.core.pipeline import Pipeline
 from pdb_processor.core.splitter import StructureSplitter
 
-__all__ = ["Config", "PDBDownloader", "StructureSplitter"]
+__all__ = ["Config", "PDBDownloader", "Pipeline", "StructureSplitter"]
 
@@ -5,6 +5,9 @@ from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional
 
+# tqdm 进度条参数：最多每 0.5 秒刷新一次；disable=None 表示输出不是终端时不显示
+PROGRESS_OPTIONS = {"mininterval": 0.5, "disable": None}
+
 
 @dataclass
 class Config:
@@ -18,6 +21,7 @@ class Config:
     MAX_RETRIES: int = 3
     RETRY_DELAY: float = 2.0
     PDB_BASE_URL: str = "https://files.rcsb.org/download/"
+    USE_HTTP2: bool = False  # 需要可选依赖 httpx[http2]
     
     # 预处理配置
     REMOVE_HETERO: bool = True
@@ -32,10 +36,11 @@ class Config:
     
     # 内部路径（自动生成）
     _paths_initialized: bool = field(default=False, repr=False)
+    _dirs_ready: bool = field(default=False, repr=False)
     
     def __post_init__(self):
         self._init_paths()
-        self._init_logging()
+        self.setup_logging()
     
     def _init_paths(self):
         """初始化目录结构"""
@@ -53,15 +58,18 @@ class Config:
         
         self._paths_initialized = True
     
-    def _init_logging(self):
-        """初始化日志配置"""
+    def setup_logging(self):
+        """初始化日志配置（反序列化的 Config 不会执行 __post_init__，子进程中需单独调用）"""
         logging.basicConfig(
             level=self.LOG_LEVEL,
             format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
         )
     
     def ensure_directories(self):
-        """创建所有必要的目录"""
+        """创建所有必要的目录（仅首次调用时执行 mkdir，之后直接返回）"""
+        if self._dirs_ready:
+            return
+        
         directories = [
             self.raw_pdbs_dir,
             self.antigens_dir,
@@ -73,6 +81,7 @@ class Config:
         ]
         for directory in directories:
             directory.mkdir(parents=True, exist_ok=True)
+        self._dirs_ready = True
     
     def get_pdb_path(self, pdb_id: str) -> Path:
         """获取原始 PDB 文件路径"""
@@ -87,4 +96,12 @@ class Config:
         """获取抗体文件路径"""
         name = f"{pdb_id.upper()}{suffix}_antibody.pdb"
         return self.antibodies_dir / name
+    
+    def get_chain_info_cache_path(self, pdb_id: str) -> Path:
+        """获取链信息缓存文件路径（不放在 raw_pdbs 中，避免改动其 mtime）"""
+        return self.sabdab_dir / "chain_info" / f"{pdb_id.upper()}.json"
+    
+    def get_failed_entries_path(self) -> Path:
+        """获取失败条目记录文件路径（NDJSON，每行一条）"""
+        return self.sabdab_dir / "failed_entries.ndjson"
 
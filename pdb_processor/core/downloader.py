@@ -1,20 +1,60 @@
 """PDB file downloader with incremental download support"""
 
+import asyncio
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import StringIO
 from pathlib import Path
-from typing import List, Optional, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
 import requests
 from Bio.PDB import MMCIFParser, PDBIO
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
 from pdb_processor.core.config import Config
+from pdb_processor.utils.json_utils import atomic_open, atomic_write_bytes
 from pdb_processor.utils.pdb_utils import get_existing_pdb_ids, normalize_pdb_id
 
+try:
+    import aiohttp
+except ImportError:  # 可选依赖，仅异步批量下载需要
+    aiohttp = None
+
+try:
+    import gemmi
+except ImportError:  # 可选依赖，未安装时使用 Bio.PDB 转换 CIF
+    gemmi = None
+
+try:
+    import httpx
+except ImportError:  # 可选依赖，仅 HTTP/2 下载需要
+    httpx = None
+
 logger = logging.getLogger(__name__)
 
 CIF_BASE_URL = "https://files.rcsb.org/download/"
 
+# 限流和服务端临时错误，自动重试
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# 流式下载的分块大小：单次 write 足够大以减少系统调用，同时限制内存占用
+STREAM_CHUNK_SIZE = 1 << 20
+
+# 同步下载可能抛出的网络错误（requests 或 httpx）
+HTTP_ERRORS = (requests.RequestException,) + ((httpx.HTTPError,) if httpx else ())
+
+# 异步下载可能抛出的网络错误（aiohttp）
+ASYNC_HTTP_ERRORS = ((aiohttp.ClientError,) if aiohttp else ()) + (asyncio.TimeoutError,)
+
+
+def _describe_error(error: Exception) -> str:
+    """错误描述（超时等异常的 str 为空时使用异常类型名）"""
+    return str(error) or type(error).__name__
+
 
 class DownloadResult:
     """下载结果"""
@@ -34,17 +74,130 @@ class PDBDownloader:
     def __init__(self, config: Config):
         self.config = config
         self._existing_ids: Optional[Set[str]] = None
+        self._ids_lock = threading.Lock()
+        self.session = self._create_session()
+        self.http2_client = self._create_http2_client() if config.USE_HTTP2 else None
+        
+        # CIF->PDB 转换线程池（仅异步下载使用，首次需要时创建），解析器按线程复用
+        self._conv_pool: Optional[ThreadPoolExecutor] = None
+        self._tls = threading.local()
+    
+    def __enter__(self) -> "PDBDownloader":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def close(self):
+        """关闭转换线程池和 HTTP 连接"""
+        if self._conv_pool is not None:
+            self._conv_pool.shutdown(wait=True)
+            self._conv_pool = None
+        if self.http2_client is not None:
+            self.http2_client.close()
+        self.session.close()
+    
+    def _get_conv_pool(self) -> ThreadPoolExecutor:
+        """获取 CIF->PDB 转换线程池（懒创建）"""
+        with self._ids_lock:
+            if self._conv_pool is None:
+                self._conv_pool = ThreadPoolExecutor(
+                    max_workers=self.config.MAX_THREADS, thread_name_prefix="cif2pdb"
+                )
+            return self._conv_pool
+    
+    def _create_session(self) -> requests.Session:
+        """创建复用连接的 HTTP 会话（连接池 + 自动重试）"""
+        # 重试在 urllib3 连接池内完成：连接错误、读超时和 5xx 均按指数退避重试，
+        # 重试耗尽后返回最后一次响应，由 raise_for_status 统一处理
+        retry = Retry(
+            total=max(self.config.MAX_RETRIES - 1, 0),
+            backoff_factor=self.config.RETRY_DELAY,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=["GET"],
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.config.MAX_THREADS,
+            pool_maxsize=self.config.MAX_THREADS * 2,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    
+    def _create_http2_client(self) -> "httpx.Client":
+        """创建 HTTP/2 客户端：同一主机的并发请求复用一条连接多路传输"""
+        if httpx is None:
+            raise ImportError('HTTP/2 下载需要 httpx: pip install "pdb-processor[http2]"')
+        transport = httpx.HTTPTransport(
+            http2=True,
+            retries=max(self.config.MAX_RETRIES - 1, 0),
+            limits=httpx.Limits(
+                max_connections=self.config.MAX_THREADS * 2,
+                max_keepalive_connections=self.config.MAX_THREADS * 2,
+            ),
+        )
+        return httpx.Client(transport=transport, timeout=self.config.DOWNLOAD_TIMEOUT)
+    
+    @contextmanager
+    def _get(self, url: str):
+        """发起流式 GET 请求，启用 HTTP/2 时使用 httpx，否则使用 requests 会话"""
+        if self.http2_client is not None:
+            response = self._send_http2(url)
+            try:
+                yield response
+            finally:
+                response.close()
+            return
+        
+        with self.session.get(
+            url, timeout=self.config.DOWNLOAD_TIMEOUT, stream=True
+        ) as response:
+            yield response
+    
+    def _send_http2(self, url: str) -> "httpx.Response":
+        """
+        通过 httpx 发起流式 GET 请求
+        
+        httpx 传输层只重试连接错误，RETRY_STATUS_CODES 在这里按 RETRY_DELAY 指数退避
+        重试（与 requests 会话的 urllib3 Retry 一致），重试耗尽后返回最后一次响应
+        """
+        retries = max(self.config.MAX_RETRIES - 1, 0)
+        for attempt in range(retries + 1):
+            request = self.http2_client.build_request("GET", url)
+            response = self.http2_client.send(request, stream=True)
+            if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+                return response
+            response.close()
+            logger.debug(f"HTTP {response.status_code} for {url}, retrying")
+            time.sleep(self.config.RETRY_DELAY * (2 ** attempt))
     
     @property
     def existing_pdb_ids(self) -> Set[str]:
-        """获取已存在的 PDB ID 集合（懒加载）"""
-        if self._existing_ids is None:
-            self._existing_ids = get_existing_pdb_ids(self.config.raw_pdbs_dir)
-        return self._existing_ids
+        """获取已存在的 PDB ID 集合（懒加载，多线程下只扫描一次目录）"""
+        existing = self._existing_ids
+        if existing is None:
+            with self._ids_lock:
+                if self._existing_ids is None:
+                    self._existing_ids = get_existing_pdb_ids(
+                        self.config.raw_pdbs_dir,
+                        cache_file=self.config.sabdab_dir / ".pdb_ids.cache",
+                    )
+                existing = self._existing_ids
+        return existing
     
     def refresh_existing_ids(self):
         """刷新已存在的 PDB ID 缓存"""
-        self._existing_ids = None
+        with self._ids_lock:
+            self._existing_ids = None
+    
+    def _mark_downloaded(self, pdb_id: str):
+        """记录新下载的 PDB ID"""
+        existing = self.existing_pdb_ids
+        with self._ids_lock:
+            existing.add(pdb_id)
     
     def is_downloaded(self, pdb_id: str) -> bool:
         """检查 PDB 是否已下载（大小写不敏感）"""
@@ -70,83 +223,126 @@ class PDBDownloader:
             return DownloadResult(pdb_id, True, output_path, skipped=True)
         
         # 确保目录存在
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+        self.config.ensure_directories()
         
-        # 尝试下载 PDB 格式
-        result = self._try_download_pdb(pdb_id, output_path)
+        # 尝试下载 PDB 格式（errors 收集各格式的失败原因）
+        errors: List[str] = []
+        result = self._try_download_pdb(pdb_id, output_path, errors)
         if result:
             return result
 
         # PDB 格式失败，尝试 CIF 格式并转换
-        result = self._try_download_cif(pdb_id, output_path)
+        result = self._try_download_cif(pdb_id, output_path, errors)
         if result:
             return result
 
-        error_msg = f"Failed after {self.config.MAX_RETRIES} attempts (PDB and CIF)"
+        error_msg = "; ".join(errors) or "Not found (PDB and CIF)"
         logger.error(f"Download failed: {pdb_id} - {error_msg}")
         return DownloadResult(pdb_id, False, error=error_msg)
 
-    def _try_download_pdb(self, pdb_id: str, output_path: Path) -> Optional[DownloadResult]:
+    def _try_download_pdb(
+        self, pdb_id: str, output_path: Path, errors: List[str]
+    ) -> Optional[DownloadResult]:
         """尝试下载 PDB 格式"""
         url = f"{self.config.PDB_BASE_URL}{pdb_id}.pdb"
 
-        for attempt in range(self.config.MAX_RETRIES):
-            try:
-                response = requests.get(url, timeout=self.config.DOWNLOAD_TIMEOUT)
-                if response.status_code == 404:
-                    logger.debug(f"PDB format not available for {pdb_id}")
-                    return None  # 尝试 CIF 格式
-                response.raise_for_status()
+        try:
+            found = self._fetch(url, lambda response: self._stream_to_file(response, output_path))
+        except HTTP_ERRORS as e:
+            logger.warning(f"PDB download failed for {pdb_id}: {e}")
+            errors.append(f"PDB: {e}")
+            return None
+        if found is None:
+            logger.debug(f"PDB format not available for {pdb_id}")
+            return None  # 尝试 CIF 格式
 
-                output_path.write_bytes(response.content)
-                self.existing_pdb_ids.add(pdb_id)
-                logger.info(f"Downloaded: {pdb_id}")
-                return DownloadResult(pdb_id, True, output_path)
-            except requests.RequestException as e:
-                logger.warning(f"PDB download failed for {pdb_id} (attempt {attempt + 1}): {e}")
-                if attempt < self.config.MAX_RETRIES - 1:
-                    time.sleep(self.config.RETRY_DELAY)
-        return None
-
-    def _try_download_cif(self, pdb_id: str, output_path: Path) -> Optional[DownloadResult]:
-        """尝试下载 CIF 格式并转换为 PDB"""
+        self._mark_downloaded(pdb_id)
+        logger.info(f"Downloaded: {pdb_id}")
+        return DownloadResult(pdb_id, True, output_path)
+
+    def _try_download_cif(
+        self, pdb_id: str, output_path: Path, errors: List[str]
+    ) -> Optional[DownloadResult]:
+        """尝试下载 CIF 格式，并直接从内存中的内容转换为 PDB"""
         url = f"{CIF_BASE_URL}{pdb_id}.cif"
 
-        for attempt in range(self.config.MAX_RETRIES):
-            try:
-                response = requests.get(url, timeout=self.config.DOWNLOAD_TIMEOUT)
+        try:
+            cif_data = self._fetch(url, self._read_body)
+        except HTTP_ERRORS as e:
+            logger.warning(f"CIF download failed for {pdb_id}: {e}")
+            errors.append(f"CIF: {e}")
+            return None
+        if cif_data is None:
+            return None
+
+        if not self._convert_cif_bytes_to_pdb(cif_data, output_path, pdb_id):
+            errors.append("CIF: conversion to PDB failed")
+            return None
+
+        self._mark_downloaded(pdb_id)
+        logger.info(f"Downloaded (CIF->PDB): {pdb_id}")
+        return DownloadResult(pdb_id, True, output_path)
+
+    def _fetch(self, url: str, handle):
+        """
+        发起 GET 请求并用 handle 读取响应体；404 返回 None，其他错误状态抛出异常
+        
+        连接错误和 RETRY_STATUS_CODES 由传输层重试；读取响应体时连接中断（如分块传输
+        被截断）传输层无法重试，在这里整体重新请求，最多 MAX_RETRIES 次
+        """
+        attempts = max(self.config.MAX_RETRIES, 1)
+        for attempt in range(attempts):
+            with self._get(url) as response:
                 if response.status_code == 404:
                     return None
                 response.raise_for_status()
+                try:
+                    return handle(response)
+                except HTTP_ERRORS as e:
+                    if attempt == attempts - 1:
+                        raise
+                    logger.warning(f"Download interrupted: {url} (attempt {attempt + 1}): {e}")
+            time.sleep(self.config.RETRY_DELAY)
 
-                # 保存临时 CIF 文件
-                cif_path = output_path.with_suffix(".cif")
-                cif_path.write_bytes(response.content)
-
-                # 转换 CIF 到 PDB
-                if self._convert_cif_to_pdb(cif_path, output_path, pdb_id):
-                    cif_path.unlink()  # 删除临时 CIF 文件
-                    self.existing_pdb_ids.add(pdb_id)
-                    logger.info(f"Downloaded (CIF->PDB): {pdb_id}")
-                    return DownloadResult(pdb_id, True, output_path)
-                else:
-                    cif_path.unlink(missing_ok=True)
-                    return None
-            except requests.RequestException as e:
-                logger.warning(f"CIF download failed for {pdb_id} (attempt {attempt + 1}): {e}")
-                if attempt < self.config.MAX_RETRIES - 1:
-                    time.sleep(self.config.RETRY_DELAY)
-        return None
-
-    def _convert_cif_to_pdb(self, cif_path: Path, pdb_path: Path, pdb_id: str) -> bool:
-        """将 CIF 文件转换为 PDB 格式"""
+    def _read_body(self, response) -> bytes:
+        """读取完整的响应体"""
+        if self.http2_client is not None:
+            return response.read()
+        return response.content
+
+    def _stream_to_file(self, response, path: Path) -> Path:
+        """分块写入响应内容：先写临时文件，完成后原子替换，避免留下不完整的文件"""
+        if self.http2_client is not None:
+            chunks = response.iter_bytes(chunk_size=STREAM_CHUNK_SIZE)
+        else:
+            chunks = response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+        
+        with atomic_open(path) as f:
+            for chunk in chunks:
+                f.write(chunk)
+        return path
+
+    def _convert_cif_bytes_to_pdb(self, cif_data: bytes, pdb_path: Path, pdb_id: str) -> bool:
+        """将内存中的 CIF 内容转换为 PDB 文件（不落盘临时 CIF 文件）"""
         try:
-            parser = MMCIFParser(QUIET=True)
-            structure = parser.get_structure(pdb_id, str(cif_path))
+            cif_text = cif_data.decode("utf-8")
+            if gemmi is not None:
+                block = gemmi.cif.read_string(cif_text).sole_block()
+                pdb_text = gemmi.make_structure_from_block(block).make_pdb_string()
+            else:
+                parser = getattr(self._tls, "cif_parser", None)
+                if parser is None:
+                    parser = self._tls.cif_parser = MMCIFParser(QUIET=True)
+                io = getattr(self._tls, "pdb_io", None)
+                if io is None:
+                    io = self._tls.pdb_io = PDBIO()
 
-            io = PDBIO()
-            io.set_structure(structure)
-            io.save(str(pdb_path))
+                structure = parser.get_structure(pdb_id, StringIO(cif_text))
+                io.set_structure(structure)
+                buffer = StringIO()
+                io.save(buffer)
+                pdb_text = buffer.getvalue()
+            atomic_write_bytes(pdb_path, pdb_text.encode("utf-8"))
             return True
         except Exception as e:
             logger.warning(f"CIF to PDB conversion failed for {pdb_id}: {e}")
@@ -157,12 +353,160 @@ class PDBDownloader:
         pdb_ids: List[str],
         force: bool = False,
     ) -> List[DownloadResult]:
-        """批量下载 PDB 文件（顺序下载）"""
-        results = []
+        """批量下载 PDB 文件（线程池并行下载，共享连接池；重复的 ID 只下载一次）"""
+        unique_ids = list(dict.fromkeys(normalize_pdb_id(p) for p in pdb_ids))
+        with ThreadPoolExecutor(max_workers=self.config.MAX_THREADS) as executor:
+            results = executor.map(lambda pdb_id: self.download(pdb_id, force), unique_ids)
+            return self._expand_batch_results(pdb_ids, dict(zip(unique_ids, results)))
+    
+    async def download_batch_async(
+        self,
+        pdb_ids: List[str],
+        force: bool = False,
+    ) -> List[DownloadResult]:
+        """
+        异步批量下载 PDB 文件（单事件循环，并发请求数受 MAX_THREADS 限制）
+        
+        需要可选依赖 aiohttp: pip install "pdb-processor[async]"
+        """
+        semaphore = asyncio.Semaphore(self.config.MAX_THREADS)
+        
+        async with self.create_async_session() as session:
+            async def bounded(pdb_id: str) -> DownloadResult:
+                async with semaphore:
+                    return await self.download_async(session, pdb_id, force)
+            
+            unique_ids = list(dict.fromkeys(normalize_pdb_id(p) for p in pdb_ids))
+            results = await asyncio.gather(*(bounded(p) for p in unique_ids))
+        
+        return self._expand_batch_results(pdb_ids, dict(zip(unique_ids, results)))
+    
+    @staticmethod
+    def _expand_batch_results(
+        pdb_ids: List[str], results: Dict[str, DownloadResult]
+    ) -> List[DownloadResult]:
+        """按输入顺序展开去重后的下载结果，同一 ID 再次出现时视为跳过下载（与顺序下载一致）"""
+        expanded = []
+        seen = set()
         for pdb_id in pdb_ids:
-            result = self.download(pdb_id, force)
-            results.append(result)
-        return results
+            pdb_id = normalize_pdb_id(pdb_id)
+            result = results[pdb_id]
+            if pdb_id in seen and result.success and not result.skipped:
+                result = DownloadResult(pdb_id, True, result.path, skipped=True)
+            seen.add(pdb_id)
+            expanded.append(result)
+        return expanded
+    
+    def create_async_session(self, limit: Optional[int] = None) -> "aiohttp.ClientSession":
+        """
+        创建 aiohttp 会话（复用连接，连接数默认受 MAX_THREADS 限制）
+        
+        需要在事件循环中调用，并以 async with 使用
+        """
+        if aiohttp is None:
+            raise ImportError('异步下载需要 aiohttp: pip install "pdb-processor[async]"')
+        
+        limit = limit or self.config.MAX_THREADS
+        connector = aiohttp.TCPConnector(
+            limit=limit,
+            limit_per_host=limit,
+            keepalive_timeout=60,
+        )
+        timeout = aiohttp.ClientTimeout(total=self.config.DOWNLOAD_TIMEOUT)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+    
+    async def download_async(
+        self, session: "aiohttp.ClientSession", pdb_id: str, force: bool = False
+    ) -> DownloadResult:
+        """异步下载单个 PDB 文件（PDB 格式优先，失败后尝试 CIF 并转换）"""
+        pdb_id = normalize_pdb_id(pdb_id)
+        output_path = self.config.get_pdb_path(pdb_id)
+        
+        if not force and self.is_downloaded(pdb_id):
+            logger.debug(f"Skipping {pdb_id}: already exists")
+            return DownloadResult(pdb_id, True, output_path, skipped=True)
+        
+        self.config.ensure_directories()
+        loop = asyncio.get_running_loop()
+        
+        # 尝试下载 PDB 格式（errors 收集各格式的失败原因，与同步下载一致）
+        errors: List[str] = []
+        pdb_url = f"{self.config.PDB_BASE_URL}{pdb_id}.pdb"
+        try:
+            found = await self._fetch_async(session, pdb_url, output_path)
+        except ASYNC_HTTP_ERRORS as e:
+            logger.warning(f"PDB download failed for {pdb_id}: {e!r}")
+            errors.append(f"PDB: {_describe_error(e)}")
+            found = False
+        if found:
+            self._mark_downloaded(pdb_id)
+            logger.info(f"Downloaded: {pdb_id}")
+            return DownloadResult(pdb_id, True, output_path)
+        
+        # PDB 格式失败，尝试 CIF 格式并转换
+        try:
+            cif_data = await self._read_async(session, f"{CIF_BASE_URL}{pdb_id}.cif")
+        except ASYNC_HTTP_ERRORS as e:
+            logger.warning(f"CIF download failed for {pdb_id}: {e!r}")
+            errors.append(f"CIF: {_describe_error(e)}")
+            cif_data = None
+        if cif_data is not None:
+            converted = await loop.run_in_executor(
+                self._get_conv_pool(), self._convert_cif_bytes_to_pdb, cif_data, output_path, pdb_id
+            )
+            if converted:
+                self._mark_downloaded(pdb_id)
+                logger.info(f"Downloaded (CIF->PDB): {pdb_id}")
+                return DownloadResult(pdb_id, True, output_path)
+            errors.append("CIF: conversion to PDB failed")
+        
+        error_msg = "; ".join(errors) or "Not found (PDB and CIF)"
+        logger.error(f"Download failed: {pdb_id} - {error_msg}")
+        return DownloadResult(pdb_id, False, error=error_msg)
+    
+    async def _fetch_async(
+        self, session: "aiohttp.ClientSession", url: str, path: Path
+    ) -> bool:
+        """异步流式下载到文件（404 返回 False，失败时抛出最后一次的错误）"""
+        loop = asyncio.get_running_loop()
+        
+        async def write(response) -> bool:
+            # 写文件交给线程池，不阻塞事件循环
+            with atomic_open(path) as f:
+                async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                    await loop.run_in_executor(None, f.write, chunk)
+            return True
+        
+        return bool(await self._get_with_retries_async(session, url, write))
+    
+    async def _read_async(self, session: "aiohttp.ClientSession", url: str) -> Optional[bytes]:
+        """异步读取 URL 内容到内存（404 返回 None，失败时抛出最后一次的错误）"""
+        return await self._get_with_retries_async(session, url, lambda response: response.read())
+    
+    async def _get_with_retries_async(self, session: "aiohttp.ClientSession", url: str, handle):
+        """
+        发起 GET 请求并用 handle 处理响应；404 返回 None
+        
+        连接错误、超时、响应体读取错误和 RETRY_STATUS_CODES 最多尝试 MAX_RETRIES 次，
+        其他错误状态（如 403）不重试；失败时抛出最后一次的错误
+        """
+        attempts = max(self.config.MAX_RETRIES, 1)
+        for attempt in range(attempts):
+            try:
+                async with session.get(url) as response:
+                    if response.status == 404:
+                        return None
+                    response.raise_for_status()
+                    return await handle(response)
+            except aiohttp.ClientResponseError as e:
+                if e.status not in RETRY_STATUS_CODES or attempt == attempts - 1:
+                    raise
+                logger.warning(f"Download failed: {url} (attempt {attempt + 1}): {e}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == attempts - 1:
+                    raise
+                logger.warning(f"Download failed: {url} (attempt {attempt + 1}): {e!r}")
+            await asyncio.sleep(self.config.RETRY_DELAY)
     
     def get_download_stats(
         self, results: List[DownloadResult]
@@ -0,0 +1,239 @@
+"""Download -> split pipeline with bounded in-flight work"""
+
+import logging
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pdb_processor.core.config import Config
+from pdb_processor.core.downloader import DownloadResult, PDBDownloader
+from pdb_processor.core.splitter import SplitResult, StructureSplitter
+from pdb_processor.utils.pdb_utils import normalize_pdb_id
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SplitJob:
+    """单个拆分任务（同一 PDB 可对应多个任务）"""
+
+    antigen_chains: str
+    antibody_chains: str
+    suffix: str = ""
+    tag: Any = None  # 调用方用于关联结果的对象
+
+
+@dataclass
+class PipelineResult:
+    """单个拆分任务的流水线结果"""
+
+    job: SplitJob
+    download: DownloadResult
+    split: Optional[SplitResult] = None  # 下载失败时为 None
+
+
+class Pipeline:
+    """
+    下载-拆分流水线
+
+    下载线程池完成一个 PDB 后立即把它的拆分任务交给拆分线程池，网络 I/O 与结构解析
+    重叠执行。同时在途的 PDB 数量受 max_pending 限制，网络快于拆分时不会无限堆积。
+
+    拆分受 GIL 限制，use_processes=True 时改用进程池，在多核上并行拆分。
+    """
+
+    def __init__(
+        self,
+        downloader: PDBDownloader,
+        splitter: StructureSplitter,
+        download_workers: int,
+        split_workers: int = 1,
+        max_pending: Optional[int] = None,
+        use_processes: bool = False,
+    ):
+        self.downloader = downloader
+        self.splitter = splitter
+        self.use_processes = use_processes
+        self.download_pool = ThreadPoolExecutor(
+            max_workers=max(download_workers, 1), thread_name_prefix="download"
+        )
+        if use_processes:
+            # 子进程在下载线程运行时才会启动，用 spawn 避免 fork 继承其他线程持有的锁；
+            # 每个子进程只创建一次 StructureSplitter
+            self.split_pool = ProcessPoolExecutor(
+                max_workers=max(split_workers, 1),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_split_worker,
+                initargs=(splitter.config,),
+            )
+        else:
+            self.split_pool = ThreadPoolExecutor(
+                max_workers=max(split_workers, 1), thread_name_prefix="split"
+            )
+        pending = max_pending or max(download_workers, split_workers, 1) * 2
+        self._slots = threading.BoundedSemaphore(pending)
+        self._done: "queue.Queue[List[PipelineResult]]" = queue.Queue()
+        # 本次运行中每个 PDB 的下载任务（同一 PDB 只下载一次）
+        self._downloads: Dict[str, Future] = {}
+
+    def __enter__(self) -> "Pipeline":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """关闭下载池和拆分池"""
+        self.download_pool.shutdown(wait=True)
+        self.split_pool.shutdown(wait=True)
+        self._downloads.clear()
+
+    def run(self, items: Iterable[Tuple[str, List[SplitJob]]]) -> Iterator[PipelineResult]:
+        """
+        处理 (pdb_id, 拆分任务列表) 序列，按完成顺序逐个产出结果
+
+        每个 pdb_id（不区分大小写）在本次运行中只下载一次，重复出现时复用已提交的下载
+        """
+        pending = 0
+        for pdb_id, jobs in items:
+            self._slots.acquire()
+            self._submit(pdb_id, jobs)
+            pending += 1
+
+            # 先产出已完成的结果，再继续提交
+            while True:
+                try:
+                    results = self._done.get_nowait()
+                except queue.Empty:
+                    break
+                pending -= 1
+                yield from results
+
+        while pending:
+            results = self._done.get()
+            pending -= 1
+            yield from results
+
+    def _submit(self, pdb_id: str, jobs: List[SplitJob]):
+        """提交下载（已提交过的 PDB 复用同一下载任务），下载完成后在回调中提交拆分"""
+        # 按标准化 ID 去重，大小写不同的同一 PDB 也不会被并发下载两次
+        pdb_id = normalize_pdb_id(pdb_id)
+        future = self._downloads.get(pdb_id)
+        reused = future is not None
+        if not reused:
+            future = self.download_pool.submit(self.downloader.download, pdb_id)
+            self._downloads[pdb_id] = future
+        future.add_done_callback(lambda f: self._on_downloaded(f, pdb_id, jobs, reused))
+
+    def _on_downloaded(
+        self, future: Future, pdb_id: str, jobs: List[SplitJob], reused: bool = False
+    ):
+        """下载完成回调：成功则交给拆分池，失败直接产出结果"""
+        try:
+            download = future.result()
+        except Exception as e:
+            logger.error(f"Download error: {pdb_id} - {e}")
+            download = DownloadResult(pdb_id, False, error=f"Download error: {e}")
+
+        if reused and download.success and not download.skipped:
+            # 文件已由首次提交下载，后续条目视为跳过下载，避免重复计数
+            download = DownloadResult(pdb_id, True, path=download.path, skipped=True)
+
+        if not download.success:
+            self._finish(jobs, download, [None] * len(jobs))
+            return
+
+        args = [(job.antigen_chains, job.antibody_chains, job.suffix) for job in jobs]
+        try:
+            if self.use_processes:
+                future = self.split_pool.submit(
+                    _split_in_worker, download.path, download.pdb_id, args
+                )
+            else:
+                future = self.split_pool.submit(
+                    _split_jobs, self.splitter, download.path, download.pdb_id, args
+                )
+        except Exception as e:
+            # 线程池已关闭或进程池损坏
+            self._finish(jobs, download, [_split_error(download.pdb_id, e)] * len(jobs))
+            return
+        future.add_done_callback(lambda f: self._on_split(f, download, jobs))
+
+    def _on_split(self, future: Future, download: DownloadResult, jobs: List[SplitJob]):
+        """拆分完成回调：按任务顺序配对结果"""
+        try:
+            splits = future.result()
+        except Exception as e:
+            # 子进程异常退出等无法按任务区分的错误
+            splits = [_split_error(download.pdb_id, e)] * len(jobs)
+        self._finish(jobs, download, splits)
+
+    def _finish(
+        self, jobs: List[SplitJob], download: DownloadResult, splits: List[Optional[SplitResult]]
+    ):
+        """
+        提交一个 PDB 的全部结果，并释放在途名额
+
+        文件只下载一次：只有第一个任务保留实际的下载结果，其余任务视为跳过下载，
+        避免按任务重复计数（下载失败时每个任务都记为失败）
+        """
+        repeated = download
+        if download.success and not download.skipped:
+            repeated = DownloadResult(download.pdb_id, True, path=download.path, skipped=True)
+        results = [
+            PipelineResult(job, download if i == 0 else repeated, split)
+            for i, (job, split) in enumerate(zip(jobs, splits))
+        ]
+        self._done.put(results)
+        self._slots.release()
+
+
+def _split_error(pdb_id: str, error: Exception) -> SplitResult:
+    """将拆分异常转换为失败结果"""
+    logger.error(f"Split error: {pdb_id} - {error}")
+    return SplitResult(pdb_id=pdb_id, success=False, error=f"Split error: {error}")
+
+
+def _split_jobs(
+    splitter: StructureSplitter,
+    pdb_file: Path,
+    pdb_id: str,
+    args: List[Tuple[str, str, str]],
+) -> List[SplitResult]:
+    """依次拆分同一 PDB 的所有任务（args 为 (抗原链, 抗体链, 后缀) 列表）"""
+    results = []
+    for antigen_chains, antibody_chains, suffix in args:
+        try:
+            split = splitter.split_structure(
+                pdb_file=pdb_file,
+                antigen_chains=antigen_chains,
+                antibody_chains=antibody_chains,
+                pdb_id=pdb_id,
+                suffix=suffix,
+            )
+        except Exception as e:
+            split = _split_error(pdb_id, e)
+        results.append(split)
+    return results
+
+
+# 拆分子进程内的 StructureSplitter（由进程池 initializer 创建）
+_worker_splitter: Optional[StructureSplitter] = None
+
+
+def _init_split_worker(config: Config):
+    """拆分子进程初始化：配置日志（spawn 启动的子进程不继承主进程的日志配置）"""
+    global _worker_splitter
+    config.setup_logging()
+    _worker_splitter = StructureSplitter(config)
+
+
+def _split_in_worker(
+    pdb_file: Path, pdb_id: str, args: List[Tuple[str, str, str]]
+) -> List[SplitResult]:
+    """在子进程中执行拆分（模块级函数，可被 pickle）"""
+    return _split_jobs(_worker_splitter, pdb_file, pdb_id, args)
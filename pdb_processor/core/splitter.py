@@ -1,26 +1,39 @@
 """Structure splitter for antibody-antigen complexes"""
 
 import logging
+import threading
+from collections import defaultdict
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, FrozenSet, List, Optional, Set
 
 from Bio.PDB import PDBIO, PDBParser, Select
 
 from pdb_processor.core.config import Config
 from pdb_processor.utils.pdb_utils import normalize_pdb_id, parse_chain_ids
 
+try:
+    import gemmi
+except ImportError:  # 可选依赖，未安装时使用 Bio.PDB
+    gemmi = None
+
 logger = logging.getLogger(__name__)
 
 
 class ChainSelect(Select):
-    """用于选择特定链的 Select 类"""
+    """用于选择特定链的 Select 类（保存时同步统计写出的残基数）"""
     
-    def __init__(self, chain_ids: List[str]):
-        self.chain_ids = set(chain_ids)
+    def __init__(self, chain_ids: FrozenSet[str]):
+        # 传入 frozenset 时不会复制
+        self.chain_ids = frozenset(chain_ids)
+        self.residue_count = 0
     
     def accept_chain(self, chain):
-        return chain.id in self.chain_ids
+        if chain.id not in self.chain_ids:
+            return False
+        # 链中残基全部写出，直接取 child_list 长度，无需逐残基回调计数
+        self.residue_count += len(chain)
+        return True
 
 
 @dataclass
@@ -41,24 +54,51 @@ class SplitResult:
 
 
 class StructureSplitter:
-    """结构拆分器"""
+    """结构拆分器（安装 gemmi 时使用其 C++ 解析器，否则使用 Bio.PDB）"""
     
     def __init__(self, config: Config):
         self.config = config
-        self.parser = PDBParser(QUIET=True)
-        self.io = PDBIO()
+        # PDBParser / PDBIO 带有状态（如 PDBIO.set_structure），每个线程各用一份
+        self._tls = threading.local()
+    
+    @property
+    def parser(self) -> PDBParser:
+        """当前线程的 PDBParser"""
+        parser = getattr(self._tls, "parser", None)
+        if parser is None:
+            parser = self._tls.parser = PDBParser(QUIET=True)
+        return parser
+    
+    @property
+    def io(self) -> PDBIO:
+        """当前线程的 PDBIO"""
+        io = getattr(self._tls, "io", None)
+        if io is None:
+            io = self._tls.io = PDBIO()
+        return io
     
     def get_chain_info(self, pdb_file: Path) -> Dict[str, int]:
-        """获取 PDB 文件中的链信息"""
-        structure = self.parser.get_structure("struct", str(pdb_file))
-        chain_info = {}
-        
-        for model in structure:
-            for chain in model:
-                residue_count = sum(1 for r in chain.get_residues())
-                chain_info[chain.id] = residue_count
+        """
+        获取 PDB 文件中的链信息（第一个模型中各链的残基数）
         
-        return chain_info
+        直接按固定列扫描 ATOM/HETATM 记录，不构建结构对象
+        """
+        residues: Dict[bytes, Set[bytes]] = defaultdict(set)
+        with open(pdb_file, "rb") as f:
+            data = f.read()
+        
+        for line in data.splitlines():
+            record = line[:6]
+            if record == b"ATOM  ":
+                # 列 22 为链 ID，23-27 为残基序号 + 插入码
+                residues[line[21:22]].add(line[22:27])
+            elif record == b"HETATM":
+                # 与 Bio.PDB 一致，异质残基按残基名单独区分
+                residues[line[21:22]].add(line[17:20] + line[22:27])
+            elif record == b"ENDMDL":
+                break
+        
+        return {chain.decode(): len(ids) for chain, ids in residues.items()}
     
     def split_structure(
         self,
@@ -97,7 +137,7 @@ class StructureSplitter:
             )
         
         try:
-            structure = self.parser.get_structure(pdb_id, str(pdb_file))
+            structure = self._read_structure(pdb_file, pdb_id)
         except Exception as e:
             return SplitResult(
                 pdb_id=pdb_id,
@@ -105,46 +145,32 @@ class StructureSplitter:
                 error=f"Parse error: {e}",
             )
         
-        # 验证链存在性
-        available_chains = set()
-        for model in structure:
-            for chain in model:
-                available_chains.add(chain.id)
+        # 验证链存在性（链集合只构建一次，验证与保存共用）
+        available_chains = self._get_chain_ids(structure)
+        ag_set = frozenset(ag_chains)
+        ab_set = frozenset(ab_chains)
         
-        missing_ag = set(ag_chains) - available_chains
-        missing_ab = set(ab_chains) - available_chains
+        missing_ag = ag_set - available_chains
+        missing_ab = ab_set - available_chains
         
         if missing_ag or missing_ab:
             return SplitResult(
                 pdb_id=pdb_id,
                 success=False,
-                error=f"Missing chains: ag={missing_ag}, ab={missing_ab}",
+                error=f"Missing chains: ag={set(missing_ag)}, ab={set(missing_ab)}",
                 antigen_chains=ag_chains,
                 antibody_chains=ab_chains,
             )
         
         # 确保输出目录存在
-        self.config.antigens_dir.mkdir(parents=True, exist_ok=True)
-        self.config.antibodies_dir.mkdir(parents=True, exist_ok=True)
+        self.config.ensure_directories()
         
-        # 保存抗原结构
+        # 保存抗原、抗体结构（写出时同步统计残基数）
         antigen_path = self.config.get_antigen_path(pdb_id, suffix)
-        self.io.set_structure(structure)
-        self.io.save(str(antigen_path), ChainSelect(ag_chains))
+        ag_residues = self._save_chains(structure, ag_set, antigen_path)
         
-        # 保存抗体结构
         antibody_path = self.config.get_antibody_path(pdb_id, suffix)
-        self.io.save(str(antibody_path), ChainSelect(ab_chains))
-        
-        # 统计残基数
-        ag_residues = sum(
-            sum(1 for _ in chain.get_residues())
-            for model in structure for chain in model if chain.id in ag_chains
-        )
-        ab_residues = sum(
-            sum(1 for _ in chain.get_residues())
-            for model in structure for chain in model if chain.id in ab_chains
-        )
+        ab_residues = self._save_chains(structure, ab_set, antibody_path)
         
         logger.info(f"Split {pdb_id}: antigen={ag_chains}, antibody={ab_chains}")
         
@@ -158,4 +184,33 @@ class StructureSplitter:
             antigen_residues=ag_residues,
             antibody_residues=ab_residues,
         )
-
+    
+    def _read_structure(self, pdb_file: Path, pdb_id: str):
+        """解析结构文件"""
+        if gemmi is not None:
+            return gemmi.read_structure(str(pdb_file))
+        return self.parser.get_structure(pdb_id, str(pdb_file))
+    
+    def _get_chain_ids(self, structure) -> FrozenSet[str]:
+        """获取结构中所有链 ID"""
+        if gemmi is not None:
+            return frozenset(chain.name for model in structure for chain in model)
+        return frozenset(chain.id for model in structure for chain in model)
+    
+    def _save_chains(self, structure, chain_ids: FrozenSet[str], output_path: Path) -> int:
+        """将指定链保存为 PDB 文件，返回写出的残基数"""
+        if gemmi is not None:
+            selected = structure.clone()
+            residues = 0
+            for model in selected:
+                for name in {chain.name for chain in model} - chain_ids:
+                    model.remove_chain(name)
+                # 点突变微异质性在 gemmi 中是多个残基，只按第一构象计数（与 Bio.PDB 一致）
+                residues += sum(1 for chain in model for _ in chain.first_conformer())
+            selected.write_minimal_pdb(str(output_path))
+            return residues
+        
+        select = ChainSelect(chain_ids)
+        self.io.set_structure(structure)
+        self.io.save(str(output_path), select)
+        return select.residue_count
@@ -1,56 +1,72 @@
 """SAbDab TSV file parser"""
 
-import csv
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Iterator, List, Optional
+from typing import Iterator, List, Optional, Tuple
 
-from pdb_processor.utils.pdb_utils import normalize_pdb_id, parse_chain_ids
+from pdb_processor.utils.compat import DATACLASS_SLOTS
+from pdb_processor.utils.pdb_utils import parse_chain_ids
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:  # 可选依赖，仅 parse_arrow 需要
+    pa = pc = pa_csv = None
 
 logger = logging.getLogger(__name__)
 
+# TSV 读取缓冲区大小（默认 8KB 缓冲对大文件系统调用过多）
+READ_BUFFER_SIZE = 1 << 20
+
 
-@dataclass
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class SAbDabEntry:
-    """SAbDab 数据库条目"""
+    """SAbDab 数据库条目（不可变，派生字段在构造时计算一次）"""
     
     pdb_id: str  # 标准化的 PDB ID（大写）
     original_pdb_id: str  # 原始 PDB ID
     heavy_chain: str  # 重链 ID
     light_chain: str  # 轻链 ID（可能为空）
-    antigen_chains: List[str]  # 抗原链 ID 列表
+    antigen_chains: Tuple[str, ...]  # 抗原链 ID（构造时排序并转为元组）
     antigen_type: str  # 抗原类型
     resolution: Optional[float]  # 分辨率
     method: str  # 实验方法
     
-    @property
-    def antibody_chains(self) -> List[str]:
-        """获取抗体链列表（重链 + 轻链，去重）"""
-        chains = []
-        if self.heavy_chain and self.heavy_chain not in chains:
-            chains.append(self.heavy_chain)
-        if self.light_chain and self.light_chain not in chains:
-            chains.append(self.light_chain)
-        return chains
+    # 派生字段
+    antibody_chains: Tuple[str, ...] = field(init=False, repr=False, compare=False)  # 重链 + 轻链，去重排序
+    is_valid: bool = field(init=False, repr=False, compare=False)  # 必须有抗体链和抗原链
+    antibody_chains_joined: str = field(init=False, repr=False, compare=False)  # 排序后逗号连接
+    antigen_chains_joined: str = field(init=False, repr=False, compare=False)  # 排序后逗号连接
+    entry_key: str = field(init=False, repr=False, compare=False)  # 区分同一 PDB 的不同抗体-抗原对
     
-    @property
-    def is_valid(self) -> bool:
-        """检查条目是否有效（必须有抗体链和抗原链）"""
-        return bool(self.antibody_chains and self.antigen_chains)
-    
-    @property
-    def entry_key(self) -> str:
-        """生成唯一的条目键（用于区分同一 PDB 的不同抗体-抗原对）"""
-        ab_chains = ",".join(sorted(self.antibody_chains))
-        ag_chains = ",".join(sorted(self.antigen_chains))
-        return f"{self.pdb_id}_{ab_chains}_{ag_chains}"
+    def __post_init__(self):
+        # 链在构造时排序一次，entry_key 等派生字段直接连接，无需再排序；
+        # 存为元组：parse_all 缓存的条目由所有调用方共享，不能被修改
+        antibody_chains = tuple(sorted({self.heavy_chain, self.light_chain} - {""}))
+        antigen_chains = tuple(sorted(self.antigen_chains))
+        
+        ab_chains = ",".join(antibody_chains)
+        ag_chains = ",".join(antigen_chains)
+        
+        # frozen dataclass 需通过 object.__setattr__ 赋值
+        object.__setattr__(self, "antigen_chains", antigen_chains)
+        object.__setattr__(self, "antibody_chains", antibody_chains)
+        object.__setattr__(self, "antibody_chains_joined", ab_chains)
+        object.__setattr__(self, "antigen_chains_joined", ag_chains)
+        object.__setattr__(self, "is_valid", bool(antibody_chains and antigen_chains))
+        object.__setattr__(self, "entry_key", f"{self.pdb_id}_{ab_chains}_{ag_chains}")
 
 
 class SAbDabParser:
     """SAbDab TSV 文件解析器"""
     
     REQUIRED_COLUMNS = ["pdb", "Hchain", "antigen_chain"]
+    ARROW_COLUMNS = [
+        "pdb", "Hchain", "Lchain", "antigen_chain", "antigen_type", "resolution", "method",
+    ]
     
     def __init__(self, tsv_path: str):
         self.tsv_path = Path(tsv_path)
@@ -59,55 +75,172 @@ class SAbDabParser:
     
     def parse(self) -> Iterator[SAbDabEntry]:
         """解析 TSV 文件，逐行生成 SAbDabEntry"""
-        with open(self.tsv_path, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f, delimiter="\t")
+        with open(
+            self.tsv_path, "r", encoding="utf-8", buffering=READ_BUFFER_SIZE, newline=""
+        ) as f:
+            header_line = f.readline().rstrip("\r\n")
+            if not header_line:
+                return
             
-            # 验证必需列
-            if reader.fieldnames:
-                missing = set(self.REQUIRED_COLUMNS) - set(reader.fieldnames)
-                if missing:
-                    raise ValueError(f"Missing columns: {missing}")
+            # 验证必需列，列索引只计算一次（SAbDab 为纯制表符分隔，无引号转义）
+            header = header_line.split("\t")
+            idx = {name: i for i, name in enumerate(header)}
+            missing = set(self.REQUIRED_COLUMNS) - set(idx)
+            if missing:
+                raise ValueError(f"Missing columns: {missing}")
             
-            for row_num, row in enumerate(reader, start=2):
+            indices = (
+                idx["pdb"],
+                idx["Hchain"],
+                idx.get("Lchain"),
+                idx["antigen_chain"],
+                idx.get("antigen_type"),
+                idx.get("resolution"),
+                idx.get("method"),
+            )
+            width = len(header)
+            parse_row = self._parse_row  # 循环内避免重复的属性查找
+            
+            for row_num, line in enumerate(f, start=2):
+                line = line.rstrip("\r\n")
+                if not line:
+                    continue
+                cols = line.split("\t")
+                if len(cols) < width:
+                    # 行尾缺失的列按空值处理
+                    cols.extend([""] * (width - len(cols)))
                 try:
-                    entry = self._parse_row(row)
+                    entry = parse_row(cols, indices)
                     if entry:
                         yield entry
                 except Exception as e:
                     logger.warning(f"Row {row_num}: Parse error - {e}")
     
-    def _parse_row(self, row: Dict[str, str]) -> Optional[SAbDabEntry]:
-        """解析单行数据"""
-        pdb_id = row.get("pdb", "").strip()
+    def _parse_row(
+        self, cols: List[str], indices: Tuple[Optional[int], ...]
+    ) -> Optional[SAbDabEntry]:
+        """解析单行数据（cols 为按列拆分的字段，indices 为各字段的列索引，可选列缺失时为 None）"""
+        pdb_i, h_i, l_i, ag_i, type_i, res_i, method_i = indices
+        
+        pdb_id = cols[pdb_i].strip()
         if not pdb_id or len(pdb_id) != 4:
             return None
 
         # 解析链信息，转换为大写（PDB 文件中链 ID 为大写）
-        heavy_chain = self._normalize_chain_id(row.get("Hchain", ""))
-        light_chain = self._normalize_chain_id(row.get("Lchain", ""))
-        antigen_chain_str = row.get("antigen_chain", "")
-        antigen_chains = [c.upper() for c in parse_chain_ids(antigen_chain_str)]
-
-        # 解析分辨率
-        resolution = None
-        res_str = row.get("resolution", "").strip()
-        if res_str and res_str.upper() != "NA":
-            try:
-                resolution = float(res_str)
-            except ValueError:
-                pass
+        normalize_chain_id = self._normalize_chain_id
+        heavy_chain = normalize_chain_id(cols[h_i])
+        light_chain = normalize_chain_id(cols[l_i]) if l_i is not None else ""
+        # 先整串转大写再解析：缓存的元组已是大写，每行只复制一次列表
+        antigen_chains = parse_chain_ids(cols[ag_i].upper())
+
+        resolution = self._parse_resolution(cols[res_i] if res_i is not None else "")
 
         return SAbDabEntry(
-            pdb_id=normalize_pdb_id(pdb_id),
+            pdb_id=pdb_id.upper(),  # 已 strip，等同 normalize_pdb_id
             original_pdb_id=pdb_id,
             heavy_chain=heavy_chain,
             light_chain=light_chain,
             antigen_chains=antigen_chains,
-            antigen_type=row.get("antigen_type", ""),
+            antigen_type=cols[type_i] if type_i is not None else "",
             resolution=resolution,
-            method=row.get("method", ""),
+            method=cols[method_i] if method_i is not None else "",
         )
 
+    @staticmethod
+    def _parse_resolution(res_str: str) -> Optional[float]:
+        """解析分辨率（空值、NA 或格式错误返回 None）"""
+        res_str = res_str.strip()
+        if res_str and res_str.upper() != "NA":
+            try:
+                return float(res_str)
+            except ValueError:
+                pass
+        return None
+
+    def parse_arrow(self) -> "pa.Table":
+        """
+        使用 pyarrow 的 C++ CSV 读取器整表解析 TSV（需要可选依赖 pyarrow）
+        
+        返回列: pdb_id, original_pdb_id, heavy_chain, light_chain, antigen_chain,
+        antigen_type, resolution, method。只保留 PDB ID 为 4 个字符的行；PDB ID 与链 ID
+        已去空白、转大写，"NA" 链 ID 置为空串；antigen_chain 保留原分隔格式，
+        resolution 保留原始字符串
+        
+        与 parse() 的差异：列数与表头不一致的行记录警告后跳过（parse() 会把缺失的
+        行尾列按空值补齐）
+        """
+        if pa is None:
+            raise ImportError('Arrow 解析需要 pyarrow: pip install "pdb-processor[arrow]"')
+        
+        # 验证必需列
+        with open(self.tsv_path, "r", encoding="utf-8") as f:
+            header = f.readline().rstrip("\r\n").split("\t")
+        missing = set(self.REQUIRED_COLUMNS) - set(header)
+        if missing:
+            raise ValueError(f"Missing columns: {missing}")
+        
+        # 全部按字符串读取，缺失的可选列以空串补齐（与逐行解析一致，不处理引号）
+        table = pa_csv.read_csv(
+            str(self.tsv_path),
+            parse_options=pa_csv.ParseOptions(
+                delimiter="\t", quote_char=False, invalid_row_handler=_skip_invalid_row
+            ),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: pa.string() for name in self.ARROW_COLUMNS},
+                include_columns=self.ARROW_COLUMNS,
+                include_missing_columns=True,
+                strings_can_be_null=False,
+            ),
+        )
+        columns = {name: pc.fill_null(table[name], "") for name in self.ARROW_COLUMNS}
+        
+        original_pdb_id = pc.utf8_trim_whitespace(columns["pdb"])
+        keep = pc.equal(pc.utf8_length(original_pdb_id), 4)
+        
+        def normalize_chain(array):
+            array = pc.utf8_upper(pc.utf8_trim_whitespace(array))
+            return pc.if_else(pc.equal(array, "NA"), "", array)
+        
+        return pa.table({
+            "pdb_id": pc.utf8_upper(original_pdb_id),
+            "original_pdb_id": original_pdb_id,
+            "heavy_chain": normalize_chain(columns["Hchain"]),
+            "light_chain": normalize_chain(columns["Lchain"]),
+            "antigen_chain": pc.utf8_upper(columns["antigen_chain"]),
+            "antigen_type": columns["antigen_type"],
+            "resolution": columns["resolution"],
+            "method": columns["method"],
+        }).filter(keep)
+
+    def get_valid_entries_arrow(self) -> List[SAbDabEntry]:
+        """获取所有有效的条目（基于 parse_arrow，只为有效行构造 SAbDabEntry）"""
+        table = self.parse_arrow()
+        
+        # 先按列过滤掉没有抗体链的行
+        has_antibody = pc.or_(
+            pc.not_equal(table["heavy_chain"], ""), pc.not_equal(table["light_chain"], "")
+        )
+        table = table.filter(has_antibody)
+        
+        entries = []
+        for pdb_id, original, heavy, light, antigen, antigen_type, res, method in zip(
+            *(table[name].to_pylist() for name in table.column_names)
+        ):
+            antigen_chains = parse_chain_ids(antigen)
+            if not antigen_chains:
+                continue
+            entries.append(SAbDabEntry(
+                pdb_id=pdb_id,
+                original_pdb_id=original,
+                heavy_chain=heavy,
+                light_chain=light,
+                antigen_chains=antigen_chains,
+                antigen_type=antigen_type,
+                resolution=self._parse_resolution(res),
+                method=method,
+            ))
+        return entries
+
     def _normalize_chain_id(self, chain_id: str) -> str:
         """标准化链 ID：去除空白、转大写、处理 NA"""
         chain_id = chain_id.strip().upper()
@@ -115,9 +248,38 @@ class SAbDabParser:
     
     def get_valid_entries(self) -> List[SAbDabEntry]:
         """获取所有有效的条目"""
-        return [e for e in self.parse() if e.is_valid]
+        return [e for e in self.parse_all() if e.is_valid]
     
     def get_unique_pdb_ids(self) -> set:
         """获取所有唯一的 PDB ID（标准化为大写）"""
-        return {e.pdb_id for e in self.parse()}
+        return {e.pdb_id for e in self.parse_all()}
+    
+    def parse_all(self) -> Tuple[SAbDabEntry, ...]:
+        """
+        解析整个文件并返回所有条目
+        
+        结果以文件路径、mtime 和大小为键缓存（仅保留最近一个文件），文件未变化时
+        get_valid_entries / get_unique_pdb_ids 等重复调用不再重新解析
+        """
+        st = self.tsv_path.stat()
+        return _parse_all_cached(
+            type(self), str(self.tsv_path.resolve()), st.st_mtime_ns, st.st_size
+        )
+
+
+def _skip_invalid_row(row) -> str:
+    """pyarrow 的列数不一致行处理：记录警告后跳过"""
+    # 多线程读取时 row.number 可能为 None，用行内容定位
+    logger.warning(
+        f"Skipping row with {row.actual_columns} of {row.expected_columns} columns: "
+        f"{row.text[:40]!r}"
+    )
+    return "skip"
+
 
+@lru_cache(maxsize=1)
+def _parse_all_cached(
+    parser_cls: type, tsv_path: str, mtime_ns: int, size: int
+) -> Tuple[SAbDabEntry, ...]:
+    """SAbDabParser.parse_all 的缓存实现（按解析器类型区分子类，mtime_ns 和 size 仅用作缓存键）"""
+    return tuple(parser_cls(tsv_path).parse())
@@ -1,25 +1,30 @@
 """SAbDab batch processor with parallel processing support"""
 
-import json
+import asyncio
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import asdict, dataclass, field
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
+from itertools import groupby, islice
+from operator import attrgetter
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 from tqdm import tqdm
 
-from pdb_processor.core.config import Config
+from pdb_processor.core.config import PROGRESS_OPTIONS, Config
 from pdb_processor.core.downloader import DownloadResult, PDBDownloader
+from pdb_processor.core.pipeline import Pipeline, SplitJob
 from pdb_processor.core.splitter import SplitResult, StructureSplitter
 from pdb_processor.sabdab.parser import SAbDabEntry, SAbDabParser
-from pdb_processor.utils.pdb_utils import normalize_pdb_id
+from pdb_processor.utils.compat import DATACLASS_SLOTS
+from pdb_processor.utils.json_utils import atomic_write_bytes, dumps, encode_ndjson_line
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class ProcessingStats:
     """处理统计信息"""
     
@@ -35,7 +40,7 @@ class ProcessingStats:
     duration_seconds: float = 0.0
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class EntryResult:
     """单个条目的处理结果"""
     
@@ -56,17 +61,27 @@ class SAbDabProcessor:
         self.splitter = StructureSplitter(config)
         self.stats = ProcessingStats()
         self.failed_entries: List[Dict] = []
+        self._failed_log: Optional[BinaryIO] = None
+    
+    def close(self):
+        """释放下载器持有的线程池和连接"""
+        self.downloader.close()
     
     def get_existing_entries(self) -> Set[str]:
         """获取已处理的条目键集合"""
         existing = set()
+        add = existing.add
         
-        # 检查已存在的抗原和抗体文件
-        if self.config.antigens_dir.exists():
-            for f in self.config.antigens_dir.glob("*_antigen.pdb"):
-                # 从文件名提取 PDB ID
-                pdb_id = f.stem.replace("_antigen", "")
-                existing.add(normalize_pdb_id(pdb_id[:4]))
+        # 检查已存在的抗原文件（scandir 直接返回文件名，不构造 Path）
+        try:
+            with os.scandir(self.config.antigens_dir) as files:
+                for f in files:
+                    name = f.name
+                    if name.endswith("_antigen.pdb"):
+                        # 文件名前 4 个字符即 PDB ID
+                        add(name[:4].upper())
+        except FileNotFoundError:
+            pass
         
         return existing
     
@@ -76,30 +91,50 @@ class SAbDabProcessor:
         download_result = self.downloader.download(entry.pdb_id)
         
         if not download_result.success:
-            return EntryResult(
-                entry_key=entry.entry_key,
-                pdb_id=entry.pdb_id,
-                download_success=False,
-                split_success=False,
-                error=download_result.error,
-            )
+            return self._to_entry_result(entry, download_result, None)
         
         # 拆分结构
-        antigen_chains = ",".join(entry.antigen_chains)
-        antibody_chains = ",".join(entry.antibody_chains)
+        job = self._make_split_job(entry)
+        split_result = self.splitter.split_structure(
+            pdb_file=download_result.path,
+            antigen_chains=job.antigen_chains,
+            antibody_chains=job.antibody_chains,
+            pdb_id=entry.pdb_id,
+            suffix=job.suffix,
+        )
         
+        return self._to_entry_result(entry, download_result, split_result)
+    
+    @staticmethod
+    def _make_split_job(entry: SAbDabEntry) -> SplitJob:
+        """根据条目生成拆分任务"""
         # 生成后缀用于区分同一 PDB 的不同条目
         suffix = f"_{entry.heavy_chain}"
         if entry.light_chain:
             suffix += entry.light_chain
         
-        split_result = self.splitter.split_structure(
-            pdb_file=download_result.path,
-            antigen_chains=antigen_chains,
-            antibody_chains=antibody_chains,
-            pdb_id=entry.pdb_id,
+        return SplitJob(
+            antigen_chains=entry.antigen_chains_joined,
+            antibody_chains=entry.antibody_chains_joined,
             suffix=suffix,
+            tag=entry,
         )
+    
+    @staticmethod
+    def _to_entry_result(
+        entry: SAbDabEntry,
+        download_result: DownloadResult,
+        split_result: Optional[SplitResult],
+    ) -> EntryResult:
+        """合并下载和拆分结果"""
+        if not download_result.success:
+            return EntryResult(
+                entry_key=entry.entry_key,
+                pdb_id=entry.pdb_id,
+                download_success=False,
+                split_success=False,
+                error=download_result.error,
+            )
         
         return EntryResult(
             entry_key=entry.entry_key,
@@ -116,6 +151,7 @@ class SAbDabProcessor:
         incremental: bool = True,
         max_threads: int = 1,
         limit: Optional[int] = None,
+        processes: int = 0,
     ) -> ProcessingStats:
         """
         批量处理 SAbDab 数据库
@@ -125,10 +161,57 @@ class SAbDabProcessor:
             incremental: 是否增量处理（跳过已存在的）
             max_threads: 最大线程数
             limit: 限制处理数量（用于测试）
+            processes: 拆分进程数（0 表示在线程中拆分）
         
         Returns:
             ProcessingStats 统计信息
         """
+        entries_to_process, total = self._start_run(tsv_path, incremental, limit)
+        
+        try:
+            # 处理条目
+            results = self._process_entries(
+                entries_to_process, max_threads, processes, total=total
+            )
+            
+            # 统计结果
+            self._compile_stats(results)
+        finally:
+            self._close_failed_log()
+        
+        return self._finish_run()
+
+    async def process_sabdab_async(
+        self,
+        tsv_path: str,
+        incremental: bool = True,
+        max_threads: int = 1,
+        limit: Optional[int] = None,
+    ) -> ProcessingStats:
+        """
+        批量处理 SAbDab 数据库（aiohttp 异步下载）
+        
+        单个事件循环中并发下载，最多 max_threads * 4 个 PDB 同时在途；拆分在线程中执行，
+        与下载重叠。需要可选依赖 aiohttp: pip install "pdb-processor[async]"
+        
+        参数与返回值同 process_sabdab
+        """
+        entries_to_process, total = self._start_run(tsv_path, incremental, limit)
+        
+        try:
+            results = await self._process_entries_async(
+                entries_to_process, max_threads, total=total
+            )
+            self._compile_stats(results)
+        finally:
+            self._close_failed_log()
+        
+        return self._finish_run()
+
+    def _start_run(
+        self, tsv_path: str, incremental: bool, limit: Optional[int]
+    ) -> Tuple[Iterator[SAbDabEntry], int]:
+        """重置统计，返回待处理条目的迭代器及其数量（进度条总数）"""
         self.stats = ProcessingStats()
         self.stats.start_time = datetime.now().isoformat()
         self.failed_entries = []
@@ -136,40 +219,19 @@ class SAbDabProcessor:
         # 确保目录存在
         self.config.ensure_directories()
         
-        # 解析 SAbDab 文件
-        parser = SAbDabParser(tsv_path)
-        entries = parser.get_valid_entries()
-        
-        self.stats.total_entries = len(list(parser.parse()))
-        self.stats.valid_entries = len(entries)
-        
-        logger.info(f"Parsed {self.stats.valid_entries} valid entries")
-        
         # 增量处理：获取已存在的 PDB
-        existing_pdbs = set()
+        existing_pdbs: Set[str] = set()
         if incremental:
             existing_pdbs = self.get_existing_entries()
             logger.info(f"Found {len(existing_pdbs)} existing PDB IDs")
         
-        # 过滤已处理的条目
-        entries_to_process = []
-        for entry in entries:
-            if incremental and entry.pdb_id in existing_pdbs:
-                self.stats.skipped_existing += 1
-            else:
-                entries_to_process.append(entry)
-        
-        if limit:
-            entries_to_process = entries_to_process[:limit]
-        
-        logger.info(f"Processing {len(entries_to_process)} entries")
-        
-        # 处理条目
-        results = self._process_entries(entries_to_process, max_threads)
-        
-        # 统计结果
-        self._compile_stats(results)
-        
+        # 先流式扫描一遍得到统计与进度条总数，处理时再流式解析，条目不整体驻留内存
+        parser = SAbDabParser(tsv_path)
+        total = self._count_entries(parser, existing_pdbs, limit)
+        return self._iter_entries_to_process(parser, existing_pdbs, limit), total
+
+    def _finish_run(self) -> ProcessingStats:
+        """记录结束时间并保存报告"""
         self.stats.end_time = datetime.now().isoformat()
         
         # 保存报告
@@ -177,69 +239,211 @@ class SAbDabProcessor:
 
         return self.stats
 
+    def _count_entries(
+        self, parser: SAbDabParser, existing_pdbs: Set[str], limit: Optional[int]
+    ) -> int:
+        """扫描文件累计总数、有效数和跳过数，返回待处理的条目数（受 limit 限制）"""
+        stats = self.stats
+        pending = 0
+        for entry in parser.parse():
+            stats.total_entries += 1
+            if not entry.is_valid:
+                continue
+            stats.valid_entries += 1
+            if entry.pdb_id in existing_pdbs:
+                stats.skipped_existing += 1
+            else:
+                pending += 1
+        return min(pending, limit) if limit else pending
+
+    @staticmethod
+    def _iter_entries_to_process(
+        parser: SAbDabParser, existing_pdbs: Set[str], limit: Optional[int]
+    ) -> Iterator[SAbDabEntry]:
+        """逐条产出待处理的条目（统计已由 _count_entries 完成，达到 limit 后停止读取）"""
+        entries = (
+            e for e in parser.parse() if e.is_valid and e.pdb_id not in existing_pdbs
+        )
+        return islice(entries, limit or None)
+    
     def _process_entries(
-        self, entries: List[SAbDabEntry], max_threads: int
+        self,
+        entries: Iterable[SAbDabEntry],
+        max_threads: int,
+        processes: int = 0,
+        total: Optional[int] = None,
     ) -> List[EntryResult]:
-        """处理条目列表（支持并行）"""
+        """处理条目列表：下载与拆分经流水线重叠执行（processes > 0 时在进程池中拆分）"""
         results = []
+        # 相邻的同一 PDB 条目合为一组（SAbDab 中同一 PDB 的多行通常相邻），
+        # 下载一次后依次拆分；不相邻的重复由 Pipeline 复用下载任务
+        jobs = (
+            (pdb_id, [self._make_split_job(e) for e in group])
+            for pdb_id, group in groupby(entries, key=attrgetter("pdb_id"))
+        )
 
-        if max_threads <= 1:
-            # 顺序处理
-            for entry in tqdm(entries, desc="Processing"):
-                result = self.process_entry(entry)
-                results.append(result)
-        else:
-            # 并行处理
-            with ThreadPoolExecutor(max_workers=max_threads) as executor:
-                futures = {
-                    executor.submit(self.process_entry, e): e
-                    for e in entries
-                }
-                for future in tqdm(
-                    as_completed(futures),
-                    total=len(futures),
-                    desc="Processing",
-                ):
-                    results.append(future.result())
+        with Pipeline(
+            self.downloader,
+            self.splitter,
+            download_workers=max_threads,
+            split_workers=max(processes, 1),
+            use_processes=processes > 0,
+        ) as pipeline:
+            append = results.append
+            to_entry_result = self._to_entry_result
+            record_failure = self._record_failure
+            progress = tqdm(
+                pipeline.run(jobs), total=total, desc="Processing", **PROGRESS_OPTIONS
+            )
+            for item in progress:
+                result = to_entry_result(item.job.tag, item.download, item.split)
+                append(result)
+                if result.error:
+                    record_failure(result)
 
         return results
 
+    async def _process_entries_async(
+        self, entries: Iterable[SAbDabEntry], max_threads: int, total: Optional[int] = None
+    ) -> List[EntryResult]:
+        """异步处理条目列表：下载在事件循环中并发，拆分交给单独的线程"""
+        concurrency = max(max_threads, 1) * 4
+        slots = asyncio.Semaphore(concurrency)
+        loop = asyncio.get_running_loop()
+        results: List[EntryResult] = []
+        downloads: Dict[str, asyncio.Task] = {}  # 同一 PDB 只下载一次
+        progress = tqdm(total=total, desc="Processing", **PROGRESS_OPTIONS)
+        
+        async def handle(pdb_id: str, group: List[SAbDabEntry], split_pool) -> None:
+            try:
+                task = downloads.get(pdb_id)
+                reused = task is not None
+                if not reused:
+                    task = downloads[pdb_id] = asyncio.ensure_future(
+                        self.downloader.download_async(session, pdb_id)
+                    )
+                try:
+                    download = await task
+                except Exception as e:
+                    logger.error(f"Download error: {pdb_id} - {e}")
+                    download = DownloadResult(pdb_id, False, error=f"Download error: {e}")
+                if reused and download.success and not download.skipped:
+                    download = DownloadResult(pdb_id, True, path=download.path, skipped=True)
+                
+                for i, entry in enumerate(group):
+                    if i == 1 and download.success and not download.skipped:
+                        # 同组后续条目复用已下载的文件，视为跳过下载，避免重复计数
+                        download = DownloadResult(pdb_id, True, path=download.path, skipped=True)
+                    split = None
+                    if download.success:
+                        split = await loop.run_in_executor(
+                            split_pool, self._split_entry, entry, download
+                        )
+                    result = self._to_entry_result(entry, download, split)
+                    results.append(result)
+                    if result.error:
+                        self._record_failure(result)
+                    progress.update()
+            finally:
+                slots.release()
+        
+        def on_done(task: asyncio.Task) -> None:
+            # 只丢弃正常结束的任务；出错的任务留给 gather 抛出异常
+            if not task.cancelled() and task.exception() is None:
+                tasks.discard(task)
+        
+        tasks = set()
+        try:
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="split") as split_pool:
+                async with self.downloader.create_async_session(limit=concurrency) as session:
+                    for pdb_id, group in groupby(entries, key=attrgetter("pdb_id")):
+                        # 在途数量达到上限时等待，避免一次性创建所有任务
+                        await slots.acquire()
+                        task = asyncio.ensure_future(handle(pdb_id, list(group), split_pool))
+                        tasks.add(task)
+                        task.add_done_callback(on_done)
+                    await asyncio.gather(*tasks)
+        finally:
+            progress.close()
+        return results
+
+    def _split_entry(self, entry: SAbDabEntry, download: DownloadResult) -> SplitResult:
+        """拆分单个条目（下载已成功），异常转换为失败结果"""
+        job = self._make_split_job(entry)
+        try:
+            return self.splitter.split_structure(
+                pdb_file=download.path,
+                antigen_chains=job.antigen_chains,
+                antibody_chains=job.antibody_chains,
+                pdb_id=entry.pdb_id,
+                suffix=job.suffix,
+            )
+        except Exception as e:
+            logger.error(f"Split error: {entry.pdb_id} - {e}")
+            return SplitResult(pdb_id=entry.pdb_id, success=False, error=f"Split error: {e}")
+
     def _compile_stats(self, results: List[EntryResult]):
         """编译统计信息"""
+        logger.info(
+            f"Parsed {self.stats.valid_entries} valid entries, "
+            f"processed {len(results)}"
+        )
+        
+        # 计数器在局部变量中累加，循环结束后写回
+        stats = self.stats
+        downloaded = stats.downloaded
+        download_failed = stats.download_failed
+        split_success = stats.split_success
+        split_failed = stats.split_failed
+
         for result in results:
-            if result.download_success:
-                if result.skipped:
-                    pass  # 已在 skipped_existing 中计数
-                else:
-                    self.stats.downloaded += 1
+            download_success = result.download_success
+            if download_success:
+                if not result.skipped:  # 跳过的已在 skipped_existing 中计数
+                    downloaded += 1
             else:
-                self.stats.download_failed += 1
+                download_failed += 1
 
             if result.split_success:
-                self.stats.split_success += 1
-            elif result.download_success:
-                self.stats.split_failed += 1
+                split_success += 1
+            elif download_success:
+                split_failed += 1
+
+        stats.downloaded = downloaded
+        stats.download_failed = download_failed
+        stats.split_success = split_success
+        stats.split_failed = split_failed
 
-            if result.error:
-                self.failed_entries.append({
-                    "entry_key": result.entry_key,
-                    "pdb_id": result.pdb_id,
-                    "error": result.error,
-                })
+    def _record_failure(self, result: EntryResult):
+        """
+        记录失败条目，并立即以 NDJSON 追加写入失败记录文件
+        
+        每条记录写入后即 flush，运行中途崩溃或中断时已出现的失败不会丢失
+        """
+        failed_entry = {
+            "entry_key": result.entry_key,
+            "pdb_id": result.pdb_id,
+            "error": result.error,
+        }
+        self.failed_entries.append(failed_entry)
+        if self._failed_log is None:
+            # 本次运行出现第一个失败时才覆盖上次的记录
+            self._failed_log = open(self.config.get_failed_entries_path(), "wb")
+        self._failed_log.write(encode_ndjson_line(failed_entry))
+        self._failed_log.flush()
+
+    def _close_failed_log(self):
+        """关闭失败记录文件"""
+        if self._failed_log is not None:
+            self._failed_log.close()
+            self._failed_log = None
 
     def _save_reports(self):
         """保存处理报告"""
         # 保存统计信息
         stats_path = self.config.statistics_dir / "processing_summary.json"
-        stats_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(stats_path, "w") as f:
-            json.dump(asdict(self.stats), f, indent=2)
-
-        # 保存失败条目
-        if self.failed_entries:
-            failed_path = self.config.sabdab_dir / "failed_entries.json"
-            with open(failed_path, "w") as f:
-                json.dump(self.failed_entries, f, indent=2)
+        self.config.ensure_directories()
+        atomic_write_bytes(stats_path, dumps(self.stats, indent=True))
 
         logger.info(f"Reports saved to {self.config.statistics_dir}")
 
@@ -0,0 +1,52 @@
+"""Sidecar cache for per-file chain info"""
+
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+from pdb_processor.utils.json_utils import atomic_write_bytes, dumps, loads
+
+
+def get_chain_info_cached(splitter, pdb_file: Path, cache_file: Path) -> Dict[str, int]:
+    """
+    获取链信息，结果缓存在 cache_file 中
+
+    缓存以 PDB 文件的 mtime_ns 和大小为键，文件未变化时只需一次 stat 和 JSON 解码。
+    cache_file 应放在 PDB 目录之外：写入 PDB 目录会改变其 mtime，使已存在 ID 的缓存失效
+    """
+    sidecar = Path(cache_file)
+    st = os.stat(pdb_file)
+
+    cached = _read_sidecar(sidecar, st)
+    if cached is not None:
+        return cached
+
+    chain_info = splitter.get_chain_info(pdb_file)
+    _write_sidecar(sidecar, st, chain_info)
+    return chain_info
+
+
+def _read_sidecar(sidecar: Path, st: os.stat_result) -> Optional[Dict[str, int]]:
+    """读取缓存，与 PDB 文件状态不一致或文件损坏时返回 None"""
+    try:
+        data = loads(sidecar.read_bytes())
+    except (OSError, ValueError):
+        return None
+
+    if (
+        not isinstance(data, dict)
+        or data.get("mtime_ns") != st.st_mtime_ns
+        or data.get("size") != st.st_size
+    ):
+        return None
+    return data.get("chains")
+
+
+def _write_sidecar(sidecar: Path, st: os.stat_result, chain_info: Dict[str, int]):
+    """原子地写入缓存，写入失败时忽略（缓存只是加速用）"""
+    payload = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "chains": chain_info}
+    try:
+        sidecar.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(sidecar, dumps(payload))
+    except OSError:
+        pass
@@ -0,0 +1,7 @@
+"""Python version compatibility helpers"""
+
+import sys
+
+# Python 3.10+ 的 dataclass 支持 __slots__，去掉每个实例的 __dict__；
+# 用法: @dataclass(**DATACLASS_SLOTS)
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
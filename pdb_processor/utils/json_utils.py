@@ -0,0 +1,92 @@
+"""JSON / NDJSON helpers"""
+
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from dataclasses import fields, is_dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator, List
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，未安装时使用标准库 json
+    orjson = None
+
+# mkstemp 创建的临时文件权限为 0600，替换前按当前 umask 恢复为普通文件权限
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """
+    序列化为 UTF-8 编码的 JSON（安装 orjson 时使用其 C 实现）
+    
+    dataclass 实例直接序列化为对象，无需先 asdict 深拷贝
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(
+        obj, ensure_ascii=False, indent=2 if indent else None, default=_default
+    ).encode("utf-8")
+
+
+def _default(obj: Any) -> Any:
+    """标准库 json 的回退序列化：支持 dataclass"""
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return {f.name: getattr(obj, f.name) for f in fields(obj)}
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def loads(data: bytes) -> Any:
+    """反序列化 JSON"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def encode_ndjson_line(record: Any) -> bytes:
+    """将单条记录编码为一行 NDJSON（含换行符）"""
+    return dumps(record) + b"\n"
+
+
+def read_ndjson(path: Path) -> List[Any]:
+    """读取 NDJSON 文件（每行一条 JSON 记录，忽略空行）"""
+    with open(path, "rb") as f:
+        return [loads(line) for line in f if line.strip()]
+
+
+def write_ndjson(path: Path, records: Iterable[Any]):
+    """原子地写入 NDJSON 文件，写入中途崩溃不会损坏原文件"""
+    with atomic_open(path) as f:
+        for record in records:
+            f.write(encode_ndjson_line(record))
+
+
+@contextmanager
+def atomic_open(path: Path) -> Iterator[BinaryIO]:
+    """
+    以二进制写方式打开 path 的临时文件，正常退出时通过 os.replace 原子替换 path
+    
+    临时文件与目标位于同一目录，文件名由 mkstemp 生成且唯一，多个线程或进程同时写
+    同一路径时互不干扰；异常退出时删除临时文件，原文件保持不变
+    """
+    path = Path(path)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        os.chmod(tmp_name, 0o666 & ~_UMASK)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def atomic_write_bytes(path: Path, data: bytes):
+    """原子地写入字节内容（见 atomic_open）"""
+    with atomic_open(path) as f:
+        f.write(data)
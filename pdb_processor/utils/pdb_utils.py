@@ -1,9 +1,17 @@
 """PDB utility functions"""
 
+import logging
+import os
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Set
+from typing import List, Optional, Set, Tuple
 
+from pdb_processor.utils.json_utils import atomic_write_bytes, dumps, loads
 
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=4096)
 def normalize_pdb_id(pdb_id: str) -> str:
     """标准化 PDB ID（转为大写）"""
     return pdb_id.strip().upper()
@@ -19,19 +27,23 @@ def parse_chain_ids(chain_str: str) -> List[str]:
         "A | B" -> ["A", "B"]
         "NA" -> []
     """
-    if not chain_str or chain_str.strip().upper() == "NA":
-        return []
-    
-    # 处理 "|" 分隔符 (SAbDab 格式)
-    if "|" in chain_str:
-        parts = [p.strip() for p in chain_str.split("|")]
-    # 处理 "," 分隔符
-    elif "," in chain_str:
-        parts = [p.strip() for p in chain_str.split(",")]
-    else:
-        parts = [chain_str.strip()]
+    return list(_parse_chain_ids(chain_str))
+
+
+# 链 ID 分隔符归一化表
+_CHAIN_SEPARATORS = str.maketrans({"|": ","})
+
+
+@lru_cache(maxsize=4096)
+def _parse_chain_ids(chain_str: str) -> Tuple[str, ...]:
+    """parse_chain_ids 的缓存实现（返回不可变的元组，避免调用方修改缓存值）"""
+    s = chain_str.strip() if chain_str else ""
+    if not s or s.upper() == "NA":
+        return ()
     
-    return [p for p in parts if p and p.upper() != "NA"]
+    # "|"（SAbDab 格式）统一替换为 ","，一次 split 即可
+    parts = (p.strip() for p in s.translate(_CHAIN_SEPARATORS).split(","))
+    return tuple(p for p in parts if p and p.upper() != "NA")
 
 
 def file_exists_case_insensitive(directory: Path, filename: str) -> bool:
@@ -45,35 +57,68 @@ def file_exists_case_insensitive(directory: Path, filename: str) -> bool:
     Returns:
         文件是否存在（不区分大小写）
     """
-    if not directory.exists():
-        return False
-    
     filename_lower = filename.lower()
-    for file in directory.iterdir():
-        if file.name.lower() == filename_lower:
-            return True
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.lower() == filename_lower:
+                    return True
+    except FileNotFoundError:
+        pass
     return False
 
 
-def get_existing_pdb_ids(directory: Path) -> Set[str]:
+def get_existing_pdb_ids(directory: Path, cache_file: Optional[Path] = None) -> Set[str]:
     """
     获取目录中所有已存在的 PDB ID（标准化为大写）
     
     Args:
         directory: 包含 PDB 文件的目录
+        cache_file: 可选的缓存文件，以目录 mtime 为键；目录未变化时直接读取缓存，
+            不再扫描目录
     
     Returns:
         已存在的 PDB ID 集合（大写）
     """
+    try:
+        mtime_ns = os.stat(directory).st_mtime_ns
+    except FileNotFoundError:
+        return set()
+    
+    if cache_file is not None:
+        cached = _read_pdb_ids_cache(cache_file, mtime_ns)
+        if cached is not None:
+            return cached
+    
     existing = set()
-    if not directory.exists():
-        return existing
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            name = entry.name
+            if name[-4:].lower() == ".pdb":
+                # 从文件名提取 PDB ID（前4个字符）
+                existing.add(name[:4].upper())
     
-    for file in directory.iterdir():
-        if file.suffix.lower() == ".pdb":
-            # 从文件名提取 PDB ID（前4个字符）
-            pdb_id = file.stem[:4].upper()
-            existing.add(pdb_id)
+    if cache_file is not None:
+        _write_pdb_ids_cache(cache_file, mtime_ns, existing)
     
     return existing
 
+
+def _read_pdb_ids_cache(cache_file: Path, mtime_ns: int) -> Optional[Set[str]]:
+    """读取 PDB ID 缓存，目录 mtime 不匹配或缓存损坏时返回 None"""
+    try:
+        data = loads(cache_file.read_bytes())
+        if data["mtime_ns"] == mtime_ns:
+            return set(data["ids"])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _write_pdb_ids_cache(cache_file: Path, mtime_ns: int, ids: Set[str]):
+    """原子地写入 PDB ID 缓存"""
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(cache_file, dumps({"mtime_ns": mtime_ns, "ids": sorted(ids)}))
+    except OSError as e:
+        logger.debug(f"Failed to write PDB ID cache {cache_file}: {e}")